@@ -1,32 +1,39 @@
 from __future__ import annotations
 
-from bream import coders, core
+from bream import coders, core, delta
 from bream.core import (
     Codec,
     Coder,
     Document,
+    Fingerprints,
     JsonType,
     SerialisationFormat,
+    SizeAccount,
     TypeLabel,
     TypeSpec,
     decode,
     decode_document,
     encode,
     encode_to_document,
+    estimate_size,
 )
 
 __all__ = [
     "Codec",
     "Coder",
     "Document",
+    "Fingerprints",
     "JsonType",
     "SerialisationFormat",
+    "SizeAccount",
     "TypeLabel",
     "TypeSpec",
     "coders",
     "core",
     "decode",
     "decode_document",
+    "delta",
     "encode",
     "encode_to_document",
+    "estimate_size",
 ]
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import itertools
+import json
 import typing
 
 from bream.core import (
@@ -15,17 +17,35 @@ from bream.core import (
 )
 
 
+def _has_str_keys(value: dict[object, object]) -> typing.TypeGuard[dict[str, object]]:
+    # As for native elements, we deliberately reject subtypes of `str`.
+    return all(type(k) is str for k in value)
+
+
 @typing.final
 class DictCoder(Coder[dict[object, object]]):
     """Encode and decode a Python dictionary."""
 
     @property
     def version(self) -> int:
-        return 1
+        return 2
 
     def encode(self, value: dict[object, object], fmt: SerialisationFormat) -> JsonType:
+        # When every key is a plain `str` we can use a native JSON object. Otherwise we
+        # fall back to a list of `[encoded_k, encoded_v]` pairs, as in version 1.
+        if _has_str_keys(value):
+            return {k: encode(v, fmt) for k, v in value.items()}
         return [[encode(k, fmt), encode(v, fmt)] for k, v in value.items()]
 
+    def child_label(self, value: dict[object, object], index: int) -> str:
+        # `encode` encodes only the values of a dict with `str` keys, and otherwise
+        # alternately encodes each key and value.
+        if _has_str_keys(value):
+            key = next(itertools.islice(value, index, None))
+            return f"[{json.dumps(key)}]"
+        side = "key" if index % 2 == 0 else "value"
+        return f"[{index // 2}].{side}"
+
     def decode(
         self,
         data: JsonType,
@@ -33,10 +53,14 @@ class DictCoder(Coder[dict[object, object]]):
         coder_version: int,
         bream_spec: int,
     ) -> dict[object, object]:
-        if coder_version != 1:
+        if coder_version not in (1, 2):
             raise UnsupportedCoderVersionError(
                 coder=self, version_provided=coder_version
             )
+        if coder_version == 2 and type(data) is dict:
+            # Keys are plain strings, and so need no decoding. A JSON object cannot
+            # contain duplicate keys, so we also need not check for these.
+            return {k: decode(v, fmt, bream_spec) for k, v in data.items()}
         if type(data) is not list:
             msg = f"Invalid payload data: {self}, {data}"
             raise ValueError(msg)
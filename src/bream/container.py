@@ -0,0 +1,264 @@
+"""A chunked, compressed container for bream documents.
+
+The payload of a document must be a list. Its elements are split into chunks, each of
+which is compressed independently. This allows a range of elements to be read without
+decompressing the whole document.
+
+The layout of a container is:
+
+    - `MAGIC`
+    - the length of the header in bytes, as an unsigned 64-bit little-endian integer
+    - the header, which is UTF-8 encoded JSON
+    - the compressed chunks, concatenated
+
+The header records the bream spec, compression, preset dictionary, and the number of
+elements & compressed size of each chunk.
+"""
+
+from __future__ import annotations
+
+import bisect
+import enum
+import itertools
+import json
+import lzma
+import struct
+import typing
+import zlib
+
+from bream.core import Document, JsonType, Keys, SerialisationFormat, decode
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Buffer
+    from types import TracebackType
+
+MAGIC = b"bream-c\x00"
+
+_HEADER_LENGTH = struct.Struct("<Q")
+
+_SEPARATORS = (",", ":")
+
+# zlib only uses this many bytes from the end of a preset dictionary.
+_MAX_DICTIONARY_SIZE = 32768
+
+_LZMA_FILTERS: list[typing.Mapping[str, typing.Any]] = [
+    {"id": lzma.FILTER_LZMA2, "preset": 6}
+]
+
+
+class Compression(enum.Enum):
+    """The compression used for chunks in a container."""
+
+    zlib = "zlib"
+    """zlib, with a preset dictionary derived from the serialisation format."""
+
+    lzma = "lzma"
+    """Raw LZMA2. The standard library does not support preset dictionaries here."""
+
+
+class _HeaderKeys(enum.Enum):
+    compression = "compression"
+    dictionary = "dictionary"
+    chunks = "chunks"
+
+
+def _preset_dictionary(fmt: SerialisationFormat) -> str:
+    """A zlib preset dictionary for `fmt`.
+
+    This contains the reserved keys, and the prefix of an encoded object for each codec
+    at its current version. It is truncated to the part that zlib will use.
+    """
+    parts = [json.dumps(key.value) + ":" for key in Keys]
+    for codec in fmt.codecs:
+        encoded = json.dumps(
+            {
+                Keys.type_label.value: codec.type_label,
+                Keys.version.value: codec.coder.version,
+                Keys.payload.value: None,
+            },
+            separators=_SEPARATORS,
+        )
+        # zlib favours content near the end of the dictionary, so these go last.
+        parts.append(encoded.removesuffix("null}"))
+    dictionary = "".join(parts).encode()[-_MAX_DICTIONARY_SIZE:]
+    # Truncation might split a multi-byte character, which we then drop.
+    return dictionary.decode(errors="ignore")
+
+
+def _compress(data: bytes, compression: Compression, dictionary: bytes) -> bytes:
+    match compression:
+        case Compression.zlib:
+            compressor = zlib.compressobj(level=9, zdict=dictionary)
+            return compressor.compress(data) + compressor.flush()
+        case Compression.lzma:
+            return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+
+def _decompress(data: Buffer, compression: Compression, dictionary: bytes) -> bytes:
+    match compression:
+        case Compression.zlib:
+            decompressor = zlib.decompressobj(zdict=dictionary)
+            return decompressor.decompress(data) + decompressor.flush()
+        case Compression.lzma:
+            return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+
+def write_container(
+    document: Document,
+    fmt: SerialisationFormat,
+    *,
+    chunk_size: int = 1024,
+    compression: Compression = Compression.zlib,
+) -> bytes:
+    """Write `document` to a container, with `chunk_size` payload elements per chunk.
+
+    `fmt` is used only to construct the preset dictionary; it need not be the same
+    format that encoded `document`, although compression will be better if it is.
+    """
+    payload = document[Keys.payload.value]
+    if type(payload) is not list:
+        msg = "Can only write a container for a document with a list payload"
+        raise ValueError(msg)
+    if chunk_size < 1:
+        msg = f"Invalid chunk_size: {chunk_size}"
+        raise ValueError(msg)
+
+    dictionary = _preset_dictionary(fmt) if compression is Compression.zlib else ""
+    dictionary_bytes = dictionary.encode()
+    chunks: list[bytes] = []
+    chunk_index: list[JsonType] = []
+    for start in range(0, len(payload), chunk_size):
+        elements = payload[start : start + chunk_size]
+        data = json.dumps(elements, separators=_SEPARATORS).encode()
+        chunk = _compress(data, compression, dictionary_bytes)
+        chunks.append(chunk)
+        chunk_index.append([len(elements), len(chunk)])
+
+    header = json.dumps(
+        {
+            Keys.bream_spec.value: document[Keys.bream_spec.value],
+            _HeaderKeys.compression.value: compression.value,
+            _HeaderKeys.dictionary.value: dictionary,
+            _HeaderKeys.chunks.value: chunk_index,
+        },
+        separators=_SEPARATORS,
+    ).encode()
+    return b"".join((MAGIC, _HEADER_LENGTH.pack(len(header)), header, *chunks))
+
+
+@typing.final
+class Container:
+    """Random access to the payload elements of a container.
+
+    Only the header is parsed on construction. Chunks are decompressed when elements
+    within them are read. `data` may be any buffer, for example an `mmap.mmap`.
+
+    The container holds a view of `data` until it is closed, which can be done by using
+    it as a context manager. Some buffers, such as `mmap.mmap`, cannot be closed whilst
+    this view exists.
+    """
+
+    def __init__(self, data: Buffer) -> None:
+        view = memoryview(data)
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            msg = "Invalid container: bad magic"
+            raise ValueError(msg)
+        if len(view) < header_start:
+            msg = "Invalid container: bad length"
+            raise ValueError(msg)
+        (header_length,) = _HEADER_LENGTH.unpack(view[len(MAGIC) : header_start])
+        header_stop = header_start + header_length
+        if len(view) < header_stop:
+            msg = "Invalid container: bad length"
+            raise ValueError(msg)
+
+        header: JsonType = json.loads(bytes(view[header_start:header_stop]))
+        match header:
+            case {
+                Keys.bream_spec.value: int(bream_spec),
+                _HeaderKeys.compression.value: str(compression),
+                _HeaderKeys.dictionary.value: str(dictionary),
+                _HeaderKeys.chunks.value: list(chunk_index),
+            }:
+                pass
+            case _:
+                msg = "Invalid container: bad header"
+                raise ValueError(msg)
+
+        # The element index, and byte offset into `view`, at which each chunk starts.
+        element_starts = [0]
+        byte_starts = [header_stop]
+        for entry in chunk_index:
+            match entry:
+                case [int(n_elements), int(n_bytes)] if (
+                    n_elements >= 1 and n_bytes >= 0
+                ):
+                    element_starts.append(element_starts[-1] + n_elements)
+                    byte_starts.append(byte_starts[-1] + n_bytes)
+                case _:
+                    msg = f"Invalid container: bad chunk entry {entry}"
+                    raise ValueError(msg)
+        if byte_starts[-1] != len(view):
+            msg = "Invalid container: bad length"
+            raise ValueError(msg)
+
+        self._view = view
+        self._compression = Compression(compression)
+        self._dictionary = dictionary.encode()
+        self._element_starts = element_starts
+        self._byte_starts = byte_starts
+        self.bream_spec: int = bream_spec
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the view of the underlying buffer. No more elements can be read."""
+        self._view.release()
+
+    def __len__(self) -> int:
+        return self._element_starts[-1]
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self._byte_starts) - 1
+
+    def _read_chunk(self, i_chunk: int) -> list[JsonType]:
+        data = self._view[self._byte_starts[i_chunk] : self._byte_starts[i_chunk + 1]]
+        return json.loads(_decompress(data, self._compression, self._dictionary))
+
+    def read(self, start: int = 0, stop: int | None = None) -> list[JsonType]:
+        """Read the encoded payload elements `start:stop`.
+
+        Only the chunks containing these elements are decompressed.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+
+        first_chunk = bisect.bisect_right(self._element_starts, start) - 1
+        last_chunk = bisect.bisect_right(self._element_starts, stop - 1) - 1
+        offset = self._element_starts[first_chunk]
+        elements = itertools.chain.from_iterable(
+            self._read_chunk(i) for i in range(first_chunk, last_chunk + 1)
+        )
+        return list(itertools.islice(elements, start - offset, stop - offset))
+
+    def decode(
+        self, fmt: SerialisationFormat, start: int = 0, stop: int | None = None
+    ) -> list[object]:
+        """Read and decode the payload elements `start:stop`."""
+        return [decode(x, fmt, self.bream_spec) for x in self.read(start, stop)]
+
+    def read_document(self) -> Document:
+        """Read the whole document."""
+        return {Keys.bream_spec.value: self.bream_spec, Keys.payload.value: self.read()}
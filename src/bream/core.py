@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import abc
+import contextvars
 import dataclasses
 import enum
+import functools
+import hashlib
+import json
+import math
 import typing
 from typing import Any, NewType
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Callable, Iterable
 
 # FIXME: warning -- spec 0 is for pre-alpha development and WILL be broken on a
 #   regular basis
@@ -56,6 +61,37 @@ def _is_coder_encoded(obj: dict[str, JsonType]) -> typing.TypeGuard[CoderEncoded
     )
 
 
+def _strictly_equal(x: object, y: object) -> bool:
+    """Whether `x` and `y` are equal, with the same types and dict ordering throughout.
+
+    Plain `==` treats e.g. `1`, `1.0` and `True` as equal, and ignores dict ordering,
+    both of which are significant once encoded. For floats, we also distinguish `0.0`
+    from `-0.0`, and treat NaNs as equal to each other, as their JSON forms would be.
+    """
+    if x is y:
+        return True
+    if type(x) is not type(y):
+        return False
+    if isinstance(x, list | tuple):
+        x_items = typing.cast("list[object] | tuple[object, ...]", x)
+        y_items = typing.cast("list[object] | tuple[object, ...]", y)
+        return len(x_items) == len(y_items) and all(
+            map(_strictly_equal, x_items, y_items)
+        )
+    if isinstance(x, dict):
+        x_dict = typing.cast("dict[object, object]", x)
+        y_dict = typing.cast("dict[object, object]", y)
+        return _strictly_equal(list(x_dict), list(y_dict)) and all(
+            map(_strictly_equal, x_dict.values(), y_dict.values())
+        )
+    if isinstance(x, float):
+        y_float = typing.cast("float", y)
+        return (math.isnan(x) and math.isnan(y_float)) or (
+            x == y_float and math.copysign(1, x) == math.copysign(1, y_float)
+        )
+    return x == y
+
+
 type _JsonElement = bool | float | int | str | None
 type JsonType = _JsonElement | list[JsonType] | dict[str, JsonType]
 
@@ -154,6 +190,15 @@ class Coder[T](abc.ABC):
             InvalidPayloadDataError: if `data` is malformed.
         """
 
+    def child_label(self, value: T, index: int) -> str:
+        """Describe the child of `value` encoded by the `index`-th call to `encode`.
+
+        This is used to report where in a tree an error occurred, for example in
+        `SizeBudgetExceededError`. By default it is just the index, e.g. `[1]`.
+        """
+        del value
+        return f"[{index}]"
+
 
 @dataclasses.dataclass(frozen=True, slots=True)
 class Codec[T]:
@@ -179,6 +224,14 @@ class Codec[T]:
     coder: Coder[T]
     """A strategy for encoding and decoding instances of `T`."""
 
+    match_subclasses: bool = False
+    """If true, this codec will also be used to encode instances of subclasses of `T`.
+
+    The codec for the nearest type in the MRO of a value is used. A codec registered for
+    the exact type of a value always takes precedence. Note that the encoded form
+    records this codec's `type_label`, so the value will be decoded by this codec.
+    """
+
 
 @typing.final
 class SerialisationFormat:
@@ -207,24 +260,403 @@ class SerialisationFormat:
             label_to_codec[label] = codec
         self._spec_to_codec = spec_to_codec
         self._label_to_codec = label_to_codec
+        # The resolved codec for each concrete type that we have been asked to encode.
+        self._type_to_codec: dict[type, Codec[Any] | None] = {}
+
+    @property
+    def codecs(self) -> tuple[Codec[Any], ...]:
+        """All codecs in this format, in the order they were specified."""
+        return tuple(self._label_to_codec.values())
 
     def find_codec_for_value[T](self, obj: T) -> Codec[T] | None:
         """Find a suitable codec for `obj`, or `None` if there isn't one."""
-        spec = TypeSpec.from_type(type(obj))
-        return self._spec_to_codec.get(spec)
+        type_ = type(obj)
+        try:
+            return self._type_to_codec[type_]
+        except KeyError:
+            codec = self._type_to_codec[type_] = self._resolve_codec(type_)
+            return codec
+
+    def _resolve_codec(self, type_: type) -> Codec[Any] | None:
+        codec = self._spec_to_codec.get(TypeSpec.from_type(type_))
+        if codec is not None:
+            return codec
+        for base in type_.__mro__[1:]:
+            codec = self._spec_to_codec.get(TypeSpec.from_type(base))
+            if codec is not None and codec.match_subclasses:
+                return codec
+        return None
 
     def find_codec_for_type_label(self, type_label: TypeLabel) -> Codec[Any] | None:
         """Find a suitable codec for `type_label`, or `None` if there isn't one."""
         return self._label_to_codec.get(type_label)
 
 
-def encode_to_document(obj: object, fmt: SerialisationFormat) -> Document:
-    """Encode `obj`, and place inside an bream document."""
-    payload = encode(obj, fmt)
-    return {Keys.bream_spec.value: BREAM_SPEC, Keys.payload.value: payload}
+_DIGEST_SIZE = 32
+
+
+def _leaf_bytes(obj: _JsonElement) -> bytes:
+    # A canonical, self-delimiting representation of a JSON element. Types are tagged
+    # so that e.g. `1`, `1.0`, `True` and `"1"` are all distinguished.
+    type_ = type(obj)
+    if obj is None:
+        return b"n"
+    if type_ is bool:
+        return b"T" if obj else b"F"
+    if type_ is int:
+        return b"i%d;" % obj
+    if type_ is float:
+        return b"d%s;" % repr(obj).encode()
+    # Lone surrogates are valid in a `str`, so must be handled.
+    data = typing.cast("str", obj).encode("utf-8", "surrogatepass")
+    return b"s%d:%s" % (len(data), data)
+
+
+@typing.final
+class Fingerprints:
+    """Structural digests of encoded trees.
+
+    A digest is a blake2b hash of the canonical structure of a JSON tree. It does not
+    depend on the insertion order of dictionaries, and is identical across processes.
+    Note that this is a property of the JSON tree, not the encoded objects; for example
+    a `DictCoder` payload in pair form is a list, and so its digest depends on order.
+
+    When passed to `encode` or `encode_to_document`, the digest of every list and
+    `CoderEncoded` node in the output is computed bottom-up as the tree is built, and
+    cached against that node. Subsequent calls to `digest` for these nodes, or for any
+    tree containing them, re-use the cached values. Encoded trees must therefore not be
+    mutated after they have been fingerprinted.
+    """
+
+    def __init__(self) -> None:
+        # We hold a reference to each node so that its `id` cannot be re-used.
+        self._cache: dict[int, tuple[JsonType, bytes]] = {}
+
+    def __contains__(self, node: object) -> bool:
+        """Whether the digest of `node` is cached."""
+        return id(node) in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def digest(self, node: JsonType | CoderEncoded | Document) -> bytes:
+        """The digest of the tree rooted at `node`."""
+        if _is_native_element(node):
+            return hashlib.blake2b(_leaf_bytes(node), digest_size=_DIGEST_SIZE).digest()
+        return self._container_digest(node)
+
+    def record(self, node: list[JsonType] | CoderEncoded | Document) -> None:
+        """Compute the digest of `node`, and cache it for re-use."""
+        self._cache[id(node)] = (
+            typing.cast("JsonType", node),
+            self._container_digest(node),
+        )
+
+    def _container_digest(self, node: object) -> bytes:
+        cached = self._cache.get(id(node))
+        if cached is not None:
+            return cached[1]
+
+        hash_ = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        if type(node) is list:
+            children = typing.cast("list[JsonType]", node)
+            hash_.update(b"l%d;" % len(children))
+            for child in children:
+                self._update(hash_, child)
+        elif type(node) is dict:
+            items = typing.cast("dict[str, JsonType]", node)
+            hash_.update(b"o%d;" % len(items))
+            for key in sorted(items):
+                hash_.update(_leaf_bytes(key))
+                self._update(hash_, items[key])
+        else:
+            msg = f"Invalid json: {node}"
+            raise ValueError(msg)
+        return hash_.digest()
+
+    def _update(self, hash_: hashlib.blake2b, child: JsonType) -> None:
+        if _is_native_element(child):
+            hash_.update(_leaf_bytes(child))
+        else:
+            hash_.update(b"#")
+            hash_.update(self._container_digest(child))
+
+
+def _element_size(obj: _JsonElement) -> int:
+    # The length of `obj` when serialised with `json.dumps`.
+    type_ = type(obj)
+    if obj is None:
+        return 4
+    if type_ is bool:
+        return 4 if obj else 5
+    if type_ is str:
+        # This matches the escaping performed by `json.dumps`, with `ensure_ascii`.
+        return len(json.encoder.encode_basestring_ascii(typing.cast("str", obj)))
+    if type_ is float and not math.isfinite(typing.cast("float", obj)):
+        return len(json.dumps(obj))
+    return len(repr(obj))
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class SizeBudgetExceededError(ValueError):
+    """The encoded size of a value exceeded the budget."""
+
+    budget: int
+    size: int
+    path: tuple[str, ...]
+    """The location of the node being encoded when the budget was exceeded.
+
+    Each component is the type of a node (its type label, or the name of a native type).
+    If the node was still encoding its children, this is followed by the child being
+    encoded. For a list this is its index, e.g. `list[1]`; for a custom type it is given
+    by `Coder.child_label`. For example `dict["a"]` or `dict[1].value`, for the native
+    and pair forms of `DictCoder` respectively.
+    """
+
+    def __str__(self) -> str:
+        path = " -> ".join(self.path) if self.path else "<root>"
+        return f"Encoded size {self.size} exceeded budget of {self.budget} at: {path}"
+
+
+def _index_label(index: int) -> str:
+    return f"[{index}]"
+
+
+@dataclasses.dataclass(slots=True)
+class _SizeFrame:
+    label: str
+    child_label: Callable[[int], str] = _index_label
+    n_children: int = 0
+    children_size: int = 0
+    # The size of each child node that is a container. We hold a reference to each
+    # child so that its `id` cannot be re-used whilst this frame exists.
+    children: dict[int, tuple[JsonType, int]] = dataclasses.field(
+        default_factory=dict[int, tuple[JsonType, int]]
+    )
+    # Whether all children have been encoded, and we are now adding the node itself.
+    closing: bool = False
+
+
+@typing.final
+class SizeAccount:
+    """Accounting of the size of an encoded tree, when serialised with `json.dumps`.
+
+    The size is exact provided that each coder includes every value that it encodes
+    exactly once in its payload.
+
+    When passed to `encode` or `encode_to_document`, the size is accumulated as each
+    node is encoded. If `budget` is given and the size exceeds it, encoding is aborted
+    by raising `SizeBudgetExceededError`.
+    """
+
+    def __init__(self, budget: int | None = None) -> None:
+        self.budget = budget
+        self._size = 0
+        self._frames = [_SizeFrame(label="")]
+
+    @property
+    def size(self) -> int:
+        """The size of everything encoded so far."""
+        return self._size
+
+    def enter(
+        self, label: str, child_label: Callable[[int], str] | None = None
+    ) -> None:
+        """Start encoding a node of type `label`.
+
+        `child_label`, if given, describes the child encoded by each call to `encode`
+        within this node. Otherwise children are described by their index.
+        """
+        self._frames[-1].n_children += 1
+        self._frames.append(
+            _SizeFrame(label=label, child_label=child_label or _index_label)
+        )
+
+    def record(self, node: JsonType | CoderEncoded | Document) -> None:
+        """Add the size of `node`, which has just been encoded.
+
+        The size of every child node of `node` that was encoded has already been added,
+        so we only count the remainder.
+        """
+        frame = self._frames[-1]
+        frame.closing = True
+        size = self._node_size(node, frame.children)
+        self.add(size - frame.children_size)
+
+        parent = self._frames[-2]
+        parent.children_size += size
+        # The root frame has no node whose size we must later compute, so there is no
+        # need to retain its children.
+        if len(self._frames) > 2 and not _is_native_element(node):
+            parent.children[id(node)] = (typing.cast("JsonType", node), size)
+
+    def exit(self) -> None:
+        """Finish encoding the current node, whether or not this was successful."""
+        self._frames.pop()
+
+    def add(self, size: int) -> None:
+        """Add `size` bytes, and check that we remain within budget."""
+        self._size += size
+        if self.budget is not None and self._size > self.budget:
+            raise SizeBudgetExceededError(
+                budget=self.budget, size=self._size, path=self._path()
+            )
+
+    def _path(self) -> tuple[str, ...]:
+        return tuple(
+            frame.label
+            if frame.closing or not frame.n_children
+            else frame.label + frame.child_label(frame.n_children - 1)
+            for frame in self._frames[1:]
+        )
+
+    def _node_size(
+        self, node: object, children: dict[int, tuple[JsonType, int]]
+    ) -> int:
+        if _is_native_element(node):
+            return _element_size(node)
+        child = children.get(id(node))
+        if child is not None:
+            return child[1]
+        if type(node) is list:
+            items = typing.cast("list[JsonType]", node)
+            # Two bytes for the brackets, and two for each ", " separator.
+            return 2 * max(len(items), 1) + sum(
+                self._node_size(v, children) for v in items
+            )
+        if type(node) is dict:
+            entries = typing.cast("dict[str, JsonType]", node)
+            # As for lists, plus two bytes for each ": " separator.
+            return 2 * max(len(entries), 1) + sum(
+                _element_size(k) + 2 + self._node_size(v, children)
+                for k, v in entries.items()
+            )
+        msg = f"Invalid json: {node}"
+        raise ValueError(msg)
+
+
+def estimate_size(
+    obj: object, fmt: SerialisationFormat, *, budget: int | None = None
+) -> int:
+    """The approximate size of `obj` encoded with `fmt`, when serialised to JSON.
 
+    The encoded tree is not returned. See `SizeAccount` for details.
+    """
+    size_account = SizeAccount(budget=budget)
+    encode(obj, fmt, size_account=size_account)
+    return size_account.size
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _EncodeOptions:
+    fingerprints: Fingerprints | None
+    size_account: SizeAccount | None
+
+
+_ENCODE_OPTIONS: contextvars.ContextVar[_EncodeOptions | None] = contextvars.ContextVar(
+    "_ENCODE_OPTIONS", default=None
+)
+"""The options for the current call to `encode`, if any.
+
+This is a context variable so that it propagates through custom coders, which will
+recursively call `encode` without knowledge of it.
+"""
 
-def encode(obj: object, fmt: SerialisationFormat) -> JsonType:
+
+def encode_to_document(
+    obj: object,
+    fmt: SerialisationFormat,
+    *,
+    fingerprints: Fingerprints | None = None,
+    size_account: SizeAccount | None = None,
+) -> Document:
+    """Encode `obj`, and place inside an bream document.
+
+    If `fingerprints` or `size_account` are given, they are populated as described in
+    `encode`; they will also include the document itself.
+    """
+    if size_account is not None:
+        size_account.enter("document")
+    try:
+        payload = encode(obj, fmt, fingerprints=fingerprints, size_account=size_account)
+        document: Document = {
+            Keys.bream_spec.value: BREAM_SPEC,
+            Keys.payload.value: payload,
+        }
+        if fingerprints is not None:
+            fingerprints.record(document)
+        if size_account is not None:
+            size_account.record(document)
+    finally:
+        if size_account is not None:
+            size_account.exit()
+    return document
+
+
+def encode(
+    obj: object,
+    fmt: SerialisationFormat,
+    *,
+    fingerprints: Fingerprints | None = None,
+    size_account: SizeAccount | None = None,
+) -> JsonType:
+    """Encode `obj` to a JSON tree using `fmt`.
+
+    If `fingerprints` is given, the digest of each list and `CoderEncoded` node in the
+    output is computed and cached in it as the tree is built.
+
+    If `size_account` is given, the size of the output is accumulated in it as the tree
+    is built. If its budget is exceeded, `SizeBudgetExceededError` is raised.
+    """
+    if fingerprints is None and size_account is None:
+        return _encode(obj, fmt)
+
+    token = _ENCODE_OPTIONS.set(
+        _EncodeOptions(fingerprints=fingerprints, size_account=size_account)
+    )
+    try:
+        return _encode(obj, fmt)
+    finally:
+        _ENCODE_OPTIONS.reset(token)
+
+
+def _node_labels(
+    obj: object, fmt: SerialisationFormat
+) -> tuple[str, Callable[[int], str] | None]:
+    """The label for `obj` in a path, and how to label its children if not by index."""
+    type_ = type(obj)
+    if type_ is list or type_ in _ELEMENT_TYPES:
+        return type_.__name__, None
+    codec = fmt.find_codec_for_value(obj)
+    if codec is None:
+        return type_.__name__, None
+    return codec.type_label, functools.partial(codec.coder.child_label, obj)
+
+
+def _encode(obj: object, fmt: SerialisationFormat) -> JsonType:
+    options = _ENCODE_OPTIONS.get()
+    if options is None:
+        return _encode_node(obj, fmt)
+
+    size_account = options.size_account
+    if size_account is not None:
+        size_account.enter(*_node_labels(obj, fmt))
+
+    # We must always exit the size account, so that its state remains consistent if
+    # an exception is raised.
+    try:
+        result = _encode_node(obj, fmt)
+        if options.fingerprints is not None and not _is_native_element(result):
+            options.fingerprints.record(result)  # pyright: ignore [reportArgumentType]
+        if size_account is not None:
+            size_account.record(result)
+    finally:
+        if size_account is not None:
+            size_account.exit()
+    return result
+
+
+def _encode_node(obj: object, fmt: SerialisationFormat) -> JsonType:
     if _is_native_element(obj):
         return obj
 
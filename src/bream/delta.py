@@ -0,0 +1,395 @@
+"""Deltas between successive bream documents.
+
+A delta describes how to transform one document into another. It is itself a JSON tree,
+and so can be stored alongside (or instead of) the documents it relates.
+"""
+
+from __future__ import annotations
+
+import enum
+import json
+import typing
+
+from bream.coders import DictCoder
+from bream.core import (
+    Document,
+    JsonType,
+    Keys,
+    SerialisationFormat,
+    TypeLabel,
+    _is_coder_encoded,
+    _strictly_equal,
+)
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Collection, Sequence
+
+
+class _DeltaKeys(enum.Enum):
+    delta = "_delta"
+
+
+class DeltaOp(enum.Enum):
+    """The operations that can appear in a delta.
+
+    Every node in a delta is a `dict` with exactly one of these as its key.
+    """
+
+    same = "same"
+    """The node is unchanged. This only appears at the root of a delta."""
+
+    replace = "replace"
+    """The node is replaced by the given value."""
+
+    patch_payload = "payload"
+    """A `CoderEncoded` node with the same type & version, but a modified payload."""
+
+    patch_object = "object"
+    """A `dict` node with some keys modified, added or removed."""
+
+    patch_list = "list"
+    """A `list` node with a contiguous range of elements modified."""
+
+    patch_pairs = "pairs"
+    """A `list` of `[key, value]` pairs, as from `DictCoder`, modified by key."""
+
+
+def diff(old_doc: Document, new_doc: Document, fmt: SerialisationFormat) -> JsonType:
+    """Compute a delta which transforms `old_doc` into `new_doc`.
+
+    `CoderEncoded` nodes are replaced wholesale if their type or version has changed;
+    otherwise only the differences in their payloads are recorded. Payloads which are
+    lists of `[key, value]` pairs, written by a codec in `fmt` using `DictCoder`, are
+    compared by key.
+    """
+    bream_spec = old_doc[Keys.bream_spec.value]
+    if new_doc[Keys.bream_spec.value] != bream_spec:
+        msg = "Cannot diff documents with different bream_spec"
+        raise ValueError(msg)
+
+    pair_labels = frozenset(
+        codec.type_label for codec in fmt.codecs if isinstance(codec.coder, DictCoder)
+    )
+    delta = _diff(old_doc[Keys.payload.value], new_doc[Keys.payload.value], pair_labels)
+    return {
+        Keys.bream_spec.value: bream_spec,
+        _DeltaKeys.delta.value: {DeltaOp.same.value: None} if delta is None else delta,
+    }
+
+
+def apply(old_doc: Document, delta: JsonType) -> Document:
+    """Apply `delta`, as computed by `diff`, to `old_doc`.
+
+    Note that the resulting document may share unchanged subtrees with `old_doc`.
+    """
+    match delta:
+        case {
+            Keys.bream_spec.value: int(bream_spec),
+            _DeltaKeys.delta.value: node_delta,
+        }:
+            pass
+        case _:
+            msg = f"Invalid delta: {delta}"
+            raise ValueError(msg)
+    if old_doc[Keys.bream_spec.value] != bream_spec:
+        msg = "Delta was computed for a different bream_spec"
+        raise ValueError(msg)
+
+    payload = _apply(old_doc[Keys.payload.value], node_delta)
+    return {Keys.bream_spec.value: bream_spec, Keys.payload.value: payload}
+
+
+def _replace(new: JsonType) -> JsonType:
+    return {DeltaOp.replace.value: new}
+
+
+def _diff(
+    old: JsonType, new: JsonType, pair_labels: Collection[TypeLabel]
+) -> JsonType | None:
+    """A delta from `old` to `new`, or `None` if they are the same.
+
+    Payloads of `CoderEncoded` nodes with a type label in `pair_labels` are lists of
+    `[key, value]` pairs, and are compared by key.
+    """
+    if _strictly_equal(old, new):
+        return None
+
+    if type(old) is list and type(new) is list:
+        return _diff_list(old, new, pair_labels)
+
+    if type(old) is dict and type(new) is dict:
+        return _diff_dict(old, new, pair_labels)
+
+    return _replace(new)
+
+
+def _diff_dict(
+    old: dict[str, JsonType],
+    new: dict[str, JsonType],
+    pair_labels: Collection[TypeLabel],
+) -> JsonType:
+    match (_is_coder_encoded(old), _is_coder_encoded(new)):
+        case (True, True):
+            if (
+                old[Keys.type_label.value] != new[Keys.type_label.value]
+                or old[Keys.version.value] != new[Keys.version.value]
+            ):
+                return _replace(new)
+            old_payload = old[Keys.payload.value]
+            new_payload = new[Keys.payload.value]
+            delta = None
+            if (
+                old[Keys.type_label.value] in pair_labels
+                and type(old_payload) is list
+                and type(new_payload) is list
+            ):
+                delta = _diff_pairs(old_payload, new_payload, pair_labels)
+            if delta is None:
+                delta = _diff(old_payload, new_payload, pair_labels)
+            # The nodes differ but have the same type & version, so the payloads differ.
+            assert delta is not None
+            return {DeltaOp.patch_payload.value: delta}
+        case (False, False):
+            return _diff_object(old, new, pair_labels)
+        case _:
+            return _replace(new)
+
+
+def _diff_object(
+    old: dict[str, JsonType],
+    new: dict[str, JsonType],
+    pair_labels: Collection[TypeLabel],
+) -> JsonType:
+    changed: dict[str, JsonType] = {}
+    for k, v in new.items():
+        if k in old:
+            delta = _diff(old[k], v, pair_labels)
+            if delta is not None:
+                changed[k] = delta
+        else:
+            changed[k] = _replace(v)
+    removed: list[JsonType] = [k for k in old if k not in new]
+    result: dict[str, JsonType] = {"set": changed, "remove": removed}
+
+    # Applying the above gives keys in an order that might not match `new`. We only
+    # record the order explicitly if it would be wrong.
+    order = _order_after_apply(list(old), list(new))
+    if order is not None:
+        result["order"] = order
+    return {DeltaOp.patch_object.value: result}
+
+
+def _diff_list(
+    old: list[JsonType], new: list[JsonType], pair_labels: Collection[TypeLabel]
+) -> JsonType:
+    n_old = len(old)
+    n_new = len(new)
+    n_max_common = min(n_old, n_new)
+
+    start = 0
+    while start < n_max_common and _strictly_equal(old[start], new[start]):
+        start += 1
+    n_suffix = 0
+    while n_suffix < n_max_common - start and _strictly_equal(
+        old[n_old - n_suffix - 1], new[n_new - n_suffix - 1]
+    ):
+        n_suffix += 1
+
+    # We replace old[start:stop] with new[start:new_stop]; elements at the same offset
+    # within these ranges are diffed against one another.
+    stop = n_old - n_suffix
+    new_stop = n_new - n_suffix
+    items: list[JsonType] = []
+    for offset, v in enumerate(new[start:new_stop]):
+        i = start + offset
+        if i < stop:
+            delta = _diff(old[i], v, pair_labels)
+            if delta is not None:
+                items.append([offset, delta])
+        else:
+            items.append([offset, _replace(v)])
+
+    return {
+        DeltaOp.patch_list.value: {
+            "start": start,
+            "stop": stop,
+            "length": new_stop - start,
+            "items": items,
+        }
+    }
+
+
+def _pair_key(encoded_k: JsonType) -> str:
+    # A canonical hashable form of an encoded key. Unlike `==`, this distinguishes e.g.
+    # `1`, `1.0` and `True`.
+    return json.dumps(encoded_k, sort_keys=True)
+
+
+def _index_pairs(data: list[JsonType]) -> dict[str, tuple[JsonType, JsonType]] | None:
+    """Index `[key, value]` pairs by key, or `None` if `data` is not of that form."""
+    result: dict[str, tuple[JsonType, JsonType]] = {}
+    for item in data:
+        if not (type(item) is list and len(item) == 2):
+            return None
+        encoded_k, encoded_v = item
+        key = _pair_key(encoded_k)
+        if key in result:
+            return None
+        result[key] = (encoded_k, encoded_v)
+    return result
+
+
+def _diff_pairs(
+    old: list[JsonType], new: list[JsonType], pair_labels: Collection[TypeLabel]
+) -> JsonType | None:
+    """A delta from `old` to `new`, or `None` if these are not lists of pairs."""
+    old_index = _index_pairs(old)
+    new_index = _index_pairs(new)
+    if old_index is None or new_index is None:
+        return None
+
+    changed: list[JsonType] = []
+    for key, (encoded_k, encoded_v) in new_index.items():
+        if key in old_index:
+            delta = _diff(old_index[key][1], encoded_v, pair_labels)
+            if delta is not None:
+                changed.append([encoded_k, delta])
+        else:
+            changed.append([encoded_k, _replace(encoded_v)])
+    removed: list[JsonType] = [
+        encoded_k for key, (encoded_k, _) in old_index.items() if key not in new_index
+    ]
+    result: dict[str, JsonType] = {"set": changed, "remove": removed}
+
+    if _order_after_apply(list(old_index), list(new_index)) is not None:
+        result["order"] = [encoded_k for encoded_k, _ in new_index.values()]
+    return {DeltaOp.patch_pairs.value: result}
+
+
+def _order_after_apply(
+    old_keys: list[str], new_keys: list[str]
+) -> list[JsonType] | None:
+    """`new_keys` if the default ordering after applying a delta would be wrong."""
+    new_key_set = set(new_keys)
+    old_key_set = set(old_keys)
+    default = [k for k in old_keys if k in new_key_set] + [
+        k for k in new_keys if k not in old_key_set
+    ]
+    return None if default == new_keys else list(new_keys)
+
+
+def _invalid(delta: JsonType) -> ValueError:
+    return ValueError(f"Invalid delta: {delta}")
+
+
+def _apply(old: JsonType, delta: JsonType) -> JsonType:
+    match delta:
+        case {DeltaOp.same.value: None}:
+            return old
+        case {DeltaOp.replace.value: new}:
+            return new
+        case {DeltaOp.patch_payload.value: payload_delta} if type(
+            old
+        ) is dict and _is_coder_encoded(old):
+            return {
+                Keys.type_label.value: old[Keys.type_label.value],
+                Keys.version.value: old[Keys.version.value],
+                Keys.payload.value: _apply(old[Keys.payload.value], payload_delta),
+            }
+        case {DeltaOp.patch_object.value: dict(object_delta)} if type(old) is dict:
+            return _apply_object(old, object_delta)
+        case {DeltaOp.patch_list.value: dict(list_delta)} if type(old) is list:
+            return _apply_list(old, list_delta)
+        case {DeltaOp.patch_pairs.value: dict(pairs_delta)} if type(old) is list:
+            return _apply_pairs(old, pairs_delta)
+        case _:
+            raise _invalid(delta)
+
+
+def _apply_object(
+    old: dict[str, JsonType], delta: dict[str, JsonType]
+) -> dict[str, JsonType]:
+    match delta:
+        case {"set": dict(changed), "remove": list(removed)}:
+            pass
+        case _:
+            raise _invalid(delta)
+
+    if not all(type(k) is str for k in removed):
+        raise _invalid(delta)
+    removed_keys = set(removed)
+    result = {k: v for k, v in old.items() if k not in removed_keys}
+    for k, v_delta in changed.items():
+        result[k] = _apply(old.get(k), v_delta)
+
+    match delta.get("order"):
+        case None:
+            return result
+        case list(order) if all(type(k) is str for k in order) and _is_reordering(
+            order, result.keys()
+        ):
+            return {typing.cast("str", k): result[typing.cast("str", k)] for k in order}
+        case _:
+            raise _invalid(delta)
+
+
+def _is_reordering(order: Sequence[object], keys: Collection[str]) -> bool:
+    """Whether `order` contains each of `keys` exactly once, and nothing else."""
+    return len(order) == len(keys) and set(order) == set(keys)
+
+
+def _apply_list(old: list[JsonType], delta: dict[str, JsonType]) -> list[JsonType]:
+    match delta:
+        case {
+            "start": int(start),
+            "stop": int(stop),
+            "length": int(length),
+            "items": list(items),
+        } if 0 <= start <= stop <= len(old) and length >= 0:
+            pass
+        case _:
+            raise _invalid(delta)
+
+    middle: list[JsonType] = old[start : min(stop, start + length)]
+    middle.extend(None for _ in range(length - len(middle)))
+    for item in items:
+        match item:
+            case [int(offset), item_delta] if 0 <= offset < length:
+                middle[offset] = _apply(middle[offset], item_delta)
+            case _:
+                raise _invalid(delta)
+    return old[:start] + middle + old[stop:]
+
+
+def _apply_pairs(old: list[JsonType], delta: dict[str, JsonType]) -> list[JsonType]:
+    match delta:
+        case {"set": list(changed), "remove": list(removed)}:
+            pass
+        case _:
+            raise _invalid(delta)
+
+    index = _index_pairs(old)
+    if index is None:
+        raise _invalid(delta)
+    for encoded_k in removed:
+        index.pop(_pair_key(encoded_k), None)
+    for item in changed:
+        match item:
+            case [encoded_k, v_delta]:
+                key = _pair_key(encoded_k)
+                old_v = index[key][1] if key in index else None
+                index[key] = (encoded_k, _apply(old_v, v_delta))
+            case _:
+                raise _invalid(delta)
+
+    match delta.get("order"):
+        case None:
+            pairs = index.values()
+        case list(order):
+            keys = [_pair_key(encoded_k) for encoded_k in order]
+            if not _is_reordering(keys, index.keys()):
+                raise _invalid(delta)
+            pairs = [index[key] for key in keys]
+        case _:
+            raise _invalid(delta)
+    return [[encoded_k, encoded_v] for encoded_k, encoded_v in pairs]
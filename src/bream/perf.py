@@ -0,0 +1,300 @@
+"""Tools for testing and tuning the performance of bream.
+
+This provides a seeded generator of random nested values, and a harness to compare two
+implementations of encode & decode on the same inputs. The harness checks that the
+implementations agree, and measures their time and peak memory use.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import random
+import string
+import time
+import tracemalloc
+import typing
+
+from bream.coders import DictCoder
+from bream.core import (
+    BREAM_SPEC,
+    JsonType,
+    SerialisationFormat,
+    TypeLabel,
+    _strictly_equal,
+    decode,
+    encode,
+)
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, Sequence
+
+type Factory = Callable[[random.Random, Callable[[], object]], object]
+"""Build a random instance of a custom type.
+
+The first argument is the random number generator to use. The second argument can be
+called to generate a random child value, one level deeper in the tree.
+"""
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class GeneratorConfig:
+    """Parameters that control the shape of generated values."""
+
+    max_depth: int = 4
+    """The maximum depth of nesting of containers."""
+
+    max_fan_out: int = 8
+    """The maximum length of generated lists."""
+
+    max_dict_size: int = 8
+    """The maximum number of items in generated dicts."""
+
+    numeric_ratio: float = 0.5
+    """The probability that a leaf is an `int` or `float`, rather than another type."""
+
+    str_key_ratio: float = 0.9
+    """The probability that a key of a generated dict is a `str`."""
+
+    max_str_length: int = 16
+
+
+@typing.final
+class _Generator:
+    def __init__(
+        self,
+        fmt: SerialisationFormat,
+        config: GeneratorConfig,
+        factories: Mapping[TypeLabel, Factory],
+        rng: random.Random,
+    ) -> None:
+        # Every codec that we know how to generate values for. We iterate over the
+        # format's codecs so that the choice for a given seed is deterministic.
+        self._factories: list[Factory] = []
+        for codec in fmt.codecs:
+            factory = factories.get(codec.type_label)
+            if factory is None and isinstance(codec.coder, DictCoder):
+                factory = self._dict
+            if factory is not None:
+                self._factories.append(factory)
+        self._config = config
+        self._rng = rng
+
+    def value(self, depth: int = 0) -> object:
+        config = self._config
+        rng = self._rng
+        if depth >= config.max_depth or rng.random() < depth / config.max_depth:
+            return self._leaf()
+
+        def child() -> object:
+            return self.value(depth + 1)
+
+        i = rng.randrange(len(self._factories) + 1)
+        if i == len(self._factories):
+            return [child() for _ in range(rng.randint(0, config.max_fan_out))]
+        return self._factories[i](rng, child)
+
+    def _leaf(self) -> object:
+        rng = self._rng
+        if rng.random() < self._config.numeric_ratio:
+            return rng.randint(-(2**31), 2**31) if rng.random() < 0.5 else rng.random()
+        match rng.randrange(3):
+            case 0:
+                return self._str()
+            case 1:
+                return rng.random() < 0.5
+            case _:
+                return None
+
+    def _str(self) -> str:
+        length = self._rng.randint(0, self._config.max_str_length)
+        return "".join(self._rng.choices(string.ascii_letters, k=length))
+
+    def _key(self) -> object:
+        if self._rng.random() < self._config.str_key_ratio:
+            return self._str()
+        return self._leaf()
+
+    def _dict(
+        self, rng: random.Random, child: Callable[[], object]
+    ) -> dict[object, object]:
+        size = rng.randint(0, self._config.max_dict_size)
+        # Keys might collide, in which case we generate a smaller dict.
+        return {self._key(): child() for _ in range(size)}
+
+
+def generate(
+    fmt: SerialisationFormat,
+    *,
+    seed: int,
+    n: int,
+    config: GeneratorConfig | None = None,
+    factories: Mapping[TypeLabel, Factory] | None = None,
+) -> list[object]:
+    """Generate `n` random values which can be encoded with `fmt`.
+
+    Values are nested lists, native elements, and instances of the custom types in
+    `fmt`. Instances of a type are built by the factory for its label in `factories`.
+    Codecs using `DictCoder` do not need a factory; codecs with no factory are not used.
+
+    The same arguments always give the same values.
+    """
+    # We need reproducibility, not cryptographic randomness.
+    rng = random.Random(seed)  # noqa: S311
+    generator = _Generator(fmt, config or GeneratorConfig(), factories or {}, rng)
+    return [generator.value() for _ in range(n)]
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class Implementation:
+    """An implementation of encode & decode, with the signatures in `bream.core`."""
+
+    name: str
+    encode: Callable[[object, SerialisationFormat], JsonType]
+    decode: Callable[[JsonType, SerialisationFormat, int], object]
+
+
+REFERENCE = Implementation(name="reference", encode=encode, decode=decode)
+"""The implementation in `bream.core`."""
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class ImplementationMismatchError(ValueError):
+    """Two implementations gave different outputs for the same input."""
+
+    stage: typing.Literal["encode", "decode"]
+    index: int
+    """The index of the input for which the outputs differ."""
+    baseline: object
+    candidate: object
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class Measurement:
+    """Performance of an implementation over a set of inputs."""
+
+    name: str
+    encode_seconds: float
+    decode_seconds: float
+    encode_peak_bytes: int
+    decode_peak_bytes: int
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class Comparison:
+    baseline: Measurement
+    candidate: Measurement
+
+    @property
+    def encode_speedup(self) -> float:
+        return self.baseline.encode_seconds / self.candidate.encode_seconds
+
+    @property
+    def decode_speedup(self) -> float:
+        return self.baseline.decode_seconds / self.candidate.decode_seconds
+
+
+def _check_same(
+    baseline: Implementation,
+    candidate: Implementation,
+    inputs: Sequence[object],
+    fmt: SerialisationFormat,
+) -> list[JsonType]:
+    encoded: list[JsonType] = []
+    for i, x in enumerate(inputs):
+        baseline_encoded = baseline.encode(x, fmt)
+        candidate_encoded = candidate.encode(x, fmt)
+        if not _strictly_equal(baseline_encoded, candidate_encoded):
+            raise ImplementationMismatchError(
+                stage="encode",
+                index=i,
+                baseline=baseline_encoded,
+                candidate=candidate_encoded,
+            )
+        encoded.append(baseline_encoded)
+
+    for i, x in enumerate(encoded):
+        baseline_decoded = baseline.decode(x, fmt, BREAM_SPEC)
+        candidate_decoded = candidate.decode(x, fmt, BREAM_SPEC)
+        if not _strictly_equal(baseline_decoded, candidate_decoded):
+            raise ImplementationMismatchError(
+                stage="decode",
+                index=i,
+                baseline=baseline_decoded,
+                candidate=candidate_decoded,
+            )
+    return encoded
+
+
+def _time(func: Callable[[], object], repeat: int) -> float:
+    """The best time taken by `func` over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    """The peak memory allocated whilst running `func`, as seen by `tracemalloc`."""
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return peak - baseline
+
+
+def _measure(
+    implementation: Implementation,
+    inputs: Sequence[object],
+    encoded: Sequence[JsonType],
+    fmt: SerialisationFormat,
+    repeat: int,
+) -> Measurement:
+    def encode_all() -> list[JsonType]:
+        return [implementation.encode(x, fmt) for x in inputs]
+
+    def decode_all() -> list[object]:
+        return [implementation.decode(x, fmt, BREAM_SPEC) for x in encoded]
+
+    return Measurement(
+        name=implementation.name,
+        encode_seconds=_time(encode_all, repeat),
+        decode_seconds=_time(decode_all, repeat),
+        encode_peak_bytes=_peak_memory(encode_all),
+        decode_peak_bytes=_peak_memory(decode_all),
+    )
+
+
+def compare(
+    baseline: Implementation,
+    candidate: Implementation,
+    inputs: Sequence[object],
+    fmt: SerialisationFormat,
+    *,
+    repeat: int = 3,
+) -> Comparison:
+    """Check that two implementations agree on `inputs`, and measure them.
+
+    Both implementations encode every input, and then decode the encoded inputs. At
+    each stage they must give equal values of the same types, with dicts in the same
+    order.
+
+    Times are the best of `repeat` runs over all inputs. Peak memory is measured in a
+    separate run, since tracing slows execution.
+
+    Raises:
+        ImplementationMismatchError: if the implementations disagree.
+    """
+    encoded = _check_same(baseline, candidate, inputs, fmt)
+    return Comparison(
+        baseline=_measure(baseline, inputs, encoded, fmt, repeat),
+        candidate=_measure(candidate, inputs, encoded, fmt, repeat),
+    )
@@ -0,0 +1,61 @@
+"""Coders and formats shared between test modules."""
+
+from __future__ import annotations
+
+import typing
+from typing import Any
+
+import bream
+
+
+@typing.final
+class ComplexCoder(bream.Coder[complex]):
+    """An demonstration coder for Python's `complex` type."""
+
+    @property
+    def version(self) -> int:
+        return 1
+
+    def encode(self, value: complex, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        del fmt
+        return {"real": value.real, "imag": value.imag}
+
+    def decode(
+        self,
+        data: bream.JsonType,
+        fmt: bream.SerialisationFormat,
+        coder_version: int,
+        bream_spec: int,
+    ) -> complex:
+        del bream_spec, fmt
+        if coder_version != 1:
+            raise bream.core.UnsupportedCoderVersionError(
+                coder=self, version_provided=coder_version
+            )
+        if not isinstance(data, dict) or data.keys() != {"real", "imag"}:
+            raise bream.core.InvalidPayloadDataError(
+                coder=self, data=data, msg="Invalid keys"
+            )
+        if not isinstance(data["real"], float):
+            raise bream.core.InvalidPayloadDataError(
+                coder=self, data=data, msg="Invalid 'real'"
+            )
+        if not isinstance(data["imag"], float):
+            raise bream.core.InvalidPayloadDataError(
+                coder=self, data=data, msg="Invalid 'imag'"
+            )
+        return complex(data["real"], data["imag"])
+
+
+def dict_format(*codecs: bream.Codec[Any]) -> bream.SerialisationFormat:
+    """A serialisation format with `DictCoder` for `dict`, followed by `codecs`."""
+    return bream.SerialisationFormat(
+        codecs=[
+            bream.Codec(
+                bream.TypeLabel("dict"),
+                bream.TypeSpec.from_type(dict),
+                bream.coders.DictCoder(),
+            ),
+            *codecs,
+        ]
+    )
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import pytest
+
 import bream
 
 
@@ -25,8 +27,8 @@ def test_dict_str_key_round_trip() -> None:
 
     assert x_encoded == {
         "_type": "dict",
-        "_version": 1,
-        "_payload": [["a", None], ["b", 2], ["c", 4.2], ["d", "moo"]],
+        "_version": 2,
+        "_payload": {"a": None, "b": 2, "c": 4.2, "d": "moo"},
     }
     x_decoded = bream.decode(x_encoded, fmt, bream.core.BREAM_SPEC)
     assert x_decoded is not x
@@ -42,7 +44,7 @@ def test_dict_non_str_key_round_trip() -> None:
 
     assert x_encoded == {
         "_type": "dict",
-        "_version": 1,
+        "_version": 2,
         "_payload": [[1, None], [False, 2], ["c", 4.2], [None, "moo"]],
     }
     x_decoded = bream.decode(x_encoded, fmt, bream.core.BREAM_SPEC)
@@ -50,6 +52,45 @@ def test_dict_non_str_key_round_trip() -> None:
     assert x_decoded == x
 
 
+def test_dict_version_1_decode() -> None:
+    fmt = _serialisation_format()
+    x = {"a": None, 1: 2}
+    x_encoded: bream.JsonType = {
+        "_type": "dict",
+        "_version": 1,
+        "_payload": [["a", None], [1, 2]],
+    }
+    assert bream.decode(x_encoded, fmt, bream.core.BREAM_SPEC) == x
+
+
+def test_dict_version_1_rejects_object_payload() -> None:
+    fmt = _serialisation_format()
+    x_encoded: bream.JsonType = {"_type": "dict", "_version": 1, "_payload": {"a": 1}}
+    with pytest.raises(ValueError, match="Invalid payload data"):
+        bream.decode(x_encoded, fmt, bream.core.BREAM_SPEC)
+
+
+def test_nested_str_key_dict_round_trip() -> None:
+    fmt = _serialisation_format()
+    y = {"a": {"b": [1, {"c": None}]}, "d": {}}
+    y_encoded = bream.encode(y, fmt)
+    assert y_encoded == {
+        "_type": "dict",
+        "_version": 2,
+        "_payload": {
+            "a": {
+                "_type": "dict",
+                "_version": 2,
+                "_payload": {
+                    "b": [1, {"_type": "dict", "_version": 2, "_payload": {"c": None}}]
+                },
+            },
+            "d": {"_type": "dict", "_version": 2, "_payload": {}},
+        },
+    }
+    assert bream.decode(y_encoded, fmt, bream.core.BREAM_SPEC) == y
+
+
 def test_nested_structure_round_trip() -> None:
     fmt = _serialisation_format()
     x = [None, 2, 4.2, "moo"]
@@ -59,7 +100,7 @@ def test_nested_structure_round_trip() -> None:
     assert y_encoded is not y
     assert y_encoded == {
         "_type": "dict",
-        "_version": 1,
+        "_version": 2,
         "_payload": [
             ["a", None],
             [False, 2],
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import gzip
+import json
+import mmap
+import tempfile
+import zlib
+
+import pytest
+
+import bream
+from bream.container import MAGIC, Compression, Container, write_container
+from tests._coders import dict_format
+
+
+def _payload(n: int) -> list[object]:
+    return [{"index": i, "name": f"item {i}", i: [i, float(i)]} for i in range(n)]
+
+
+def test_round_trip() -> None:
+    fmt = dict_format()
+    x = _payload(1000)
+    document = bream.encode_to_document(x, fmt)
+    for compression in Compression:
+        for chunk_size in (1, 7, 100, 1000, 5000):
+            data = write_container(
+                document, fmt, chunk_size=chunk_size, compression=compression
+            )
+            container = Container(data)
+            assert len(container) == len(x)
+            assert container.n_chunks == -(-len(x) // chunk_size)
+            assert container.bream_spec == bream.core.BREAM_SPEC
+            assert container.read_document() == document
+            assert container.decode(fmt) == x
+
+
+def test_random_access() -> None:
+    fmt = dict_format()
+    x = _payload(1000)
+    document = bream.encode_to_document(x, fmt)
+    container = Container(write_container(document, fmt, chunk_size=64))
+    payload = document["_payload"]
+    assert isinstance(payload, list)
+    for start, stop in ((0, 1), (63, 65), (64, 128), (500, 900), (999, 1000), (5, 5)):
+        assert container.read(start, stop) == payload[start:stop]
+        assert container.decode(fmt, start, stop) == x[start:stop]
+    assert container.read(-3) == payload[-3:]
+    assert container.read(990, 2000) == payload[990:]
+    assert container.read(2000) == []
+
+
+def test_reads_only_required_chunks() -> None:
+    fmt = dict_format()
+    document = bream.encode_to_document(_payload(1000), fmt)
+    data = bytearray(write_container(document, fmt, chunk_size=100))
+
+    # Corrupt the first chunk; reading elements from later chunks must still succeed.
+    # A zlib stream starts with a two-byte header, so we corrupt the byte after.
+    header_length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 8], "little")
+    data[len(MAGIC) + 8 + header_length + 2] ^= 0xFF
+    container = Container(bytes(data))
+    payload = document["_payload"]
+    assert isinstance(payload, list)
+    assert container.read(100, 300) == payload[100:300]
+    with pytest.raises(zlib.error):
+        container.read(0, 1)
+
+
+def test_mmap() -> None:
+    fmt = dict_format()
+    x = _payload(100)
+    data = write_container(bream.encode_to_document(x, fmt), fmt, chunk_size=10)
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.flush()
+        with (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+            Container(mapped) as container,
+        ):
+            assert container.decode(fmt, 45, 55) == x[45:55]
+    with pytest.raises(ValueError, match="released"):
+        container.read(0, 1)
+
+
+def test_preset_dictionary_helps() -> None:
+    fmt = dict_format()
+    x = [{"a": i} for i in range(1000)]
+    document = bream.encode_to_document(x, fmt)
+    no_codecs = bream.SerialisationFormat(codecs=())
+    with_dictionary = write_container(document, fmt, chunk_size=10)
+    without_dictionary = write_container(document, no_codecs, chunk_size=10)
+    assert len(with_dictionary) < len(without_dictionary)
+    assert Container(without_dictionary).decode(fmt) == x
+
+    # Small chunks inevitably lose out to compressing the whole document, but should
+    # still be much smaller than the raw JSON.
+    raw = json.dumps(document).encode()
+    assert len(with_dictionary) < len(raw) / 3
+    assert len(gzip.compress(raw)) < len(with_dictionary)
+
+
+def test_invalid() -> None:
+    fmt = dict_format()
+    with pytest.raises(ValueError, match="list payload"):
+        write_container(bream.encode_to_document({"a": 1}, fmt), fmt)
+    with pytest.raises(ValueError, match="Invalid chunk_size"):
+        write_container(bream.encode_to_document([1], fmt), fmt, chunk_size=0)
+
+    data = write_container(bream.encode_to_document([1, 2, 3], fmt), fmt)
+    with pytest.raises(ValueError, match="bad magic"):
+        Container(b"moo" + data)
+    with pytest.raises(ValueError, match="bad length"):
+        Container(data[:-1])
+    with pytest.raises(ValueError, match="bad length"):
+        Container(MAGIC + b"\x01")
+    with pytest.raises(ValueError, match="bad length"):
+        Container(data[: len(MAGIC) + 10])
+
+    # Chunk entries with negative (or, for elements, zero) counts are invalid.
+    header_length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 8], "little")
+    header = json.loads(data[len(MAGIC) + 8 : len(MAGIC) + 8 + header_length])
+    chunk_bytes = data[len(MAGIC) + 8 + header_length :]
+    (n_elements, n_bytes) = header["chunks"][0]
+    for entry in ([0, n_bytes], [-1, n_bytes], [n_elements, -1]):
+        bad_header = json.dumps({**header, "chunks": [entry]}).encode()
+        bad_data = b"".join(
+            (MAGIC, len(bad_header).to_bytes(8, "little"), bad_header, chunk_bytes)
+        )
+        with pytest.raises(ValueError, match="bad chunk entry"):
+            Container(bad_data)
+
+
+def test_preset_dictionary_is_truncated() -> None:
+    fmt = dict_format(
+        *(
+            bream.Codec(
+                bream.TypeLabel(f"type_{i}_\N{FISH}"),
+                bream.TypeSpec(module="builtins", name=f"type_{i}"),
+                bream.coders.DictCoder(),
+            )
+            for i in range(1000)
+        )
+    )
+    x = [{"a": i} for i in range(100)]
+    data = write_container(bream.encode_to_document(x, fmt), fmt, chunk_size=10)
+    header_length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 8], "little")
+    header = json.loads(data[len(MAGIC) + 8 : len(MAGIC) + 8 + header_length])
+    dictionary: str = header["dictionary"]
+    assert 32000 < len(dictionary.encode()) <= 32768
+    assert dictionary.endswith('"_payload":')
+    assert Container(data).decode(fmt) == x
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import json
 import re
 from typing import Any
 
 import pytest
 
 import bream
+from tests._coders import dict_format
 
 
 def test_scalar_encode() -> None:
@@ -101,3 +103,160 @@ def test_list_subtype_not_accepted() -> None:
     assert isinstance(x, list)
     with pytest.raises(ValueError, match=re.escape(f"No encoder for {x}")):
         bream.encode(x, fmt)
+
+
+def test_fingerprint_distinguishes_types() -> None:
+    fingerprints = bream.Fingerprints()
+    values: list[bream.JsonType] = [
+        None,
+        True,
+        1,
+        1.0,
+        "1",
+        "",
+        [],
+        [1],
+        [[1]],
+        ["1"],
+        {},
+        {"1": 1},
+        {"1": "1"},
+    ]
+    digests = {fingerprints.digest(x) for x in values}
+    assert len(digests) == len(values)
+
+
+def test_fingerprint_dict_order_independent() -> None:
+    fmt = dict_format()
+    x = {"a": 1, "b": [2, {"c": None, "d": 3}], "e": 4.2}
+    y = {"e": 4.2, "b": [2, {"d": 3, "c": None}], "a": 1}
+    x_fingerprints = bream.Fingerprints()
+    y_fingerprints = bream.Fingerprints()
+    x_document = bream.encode_to_document(x, fmt, fingerprints=x_fingerprints)
+    y_document = bream.encode_to_document(y, fmt, fingerprints=y_fingerprints)
+    assert x_fingerprints.digest(x_document) == y_fingerprints.digest(y_document)
+
+    z = {"a": 1, "b": [2, {"c": False, "d": 3}], "e": 4.2}
+    z_document = bream.encode_to_document(z, fmt)
+    assert bream.Fingerprints().digest(z_document) != x_fingerprints.digest(x_document)
+
+
+def test_fingerprint_matches_fresh_computation() -> None:
+    fmt = dict_format()
+    x = [{"a": [1, 2.5, "three"]}, {"b": {4: None}}]
+    fingerprints = bream.Fingerprints()
+    document = bream.encode_to_document(x, fmt, fingerprints=fingerprints)
+
+    # A copy round-tripped through JSON has no cached digests, so is fingerprinted
+    # from scratch.
+    document_copy: bream.JsonType = json.loads(json.dumps(document))
+    assert fingerprints.digest(document) == bream.Fingerprints().digest(document_copy)
+
+    # Digests of subtrees are cached per node during encoding.
+    payload = document["_payload"]
+    assert isinstance(payload, list)
+    for node in payload:
+        assert isinstance(node, dict)
+        assert node in fingerprints
+        node_copy: bream.JsonType = json.loads(json.dumps(node))
+        assert fingerprints.digest(node) == bream.Fingerprints().digest(node_copy)
+
+
+def test_fingerprint_lone_surrogate() -> None:
+    fmt = dict_format()
+    x = ["\ud800", {"\udfff": "a"}]
+    fingerprints = bream.Fingerprints()
+    document = bream.encode_to_document(x, fmt, fingerprints=fingerprints)
+    document_copy: bream.JsonType = json.loads(json.dumps(document))
+    assert fingerprints.digest(document) == bream.Fingerprints().digest(document_copy)
+    assert fingerprints.digest("\ud800") != fingerprints.digest("\udfff")
+
+
+def test_fingerprint_only_while_encoding() -> None:
+    fmt = dict_format()
+    fingerprints = bream.Fingerprints()
+    bream.encode([{"a": 1}], fmt, fingerprints=fingerprints)
+    n_cached = len(fingerprints)
+    assert n_cached == 2
+
+    # Encoding without fingerprints afterwards must not populate the cache.
+    bream.encode([{"a": 1}], fmt)
+    assert len(fingerprints) == n_cached
+
+
+def test_estimate_size_matches_json() -> None:
+    fmt = dict_format()
+    values: list[object] = [
+        None,
+        True,
+        False,
+        0,
+        -123,
+        4.2,
+        1e100,
+        float("inf"),
+        "",
+        "moo",
+        [],
+        [1],
+        [1, "a", [None, []]],
+        {},
+        {"a": 1, "b": [2, {"c": None}]},
+        {1: 2, None: [3.5, {}], "x": "y"},
+        "héllo wörld 日本語" * 10,
+        'a"\\\n\t\x00' * 50,
+        "\ud800",
+        {"日本語": 'k"ey', 'a"\\\n': ["ü"]},
+    ]
+    for x in values:
+        expected = len(json.dumps(bream.encode(x, fmt)))
+        assert bream.estimate_size(x, fmt) == expected
+
+        size_account = bream.SizeAccount()
+        document = bream.encode_to_document(x, fmt, size_account=size_account)
+        assert size_account.size == len(json.dumps(document))
+
+
+def test_size_budget() -> None:
+    fmt = dict_format()
+    x = [{"a": list(range(10))}, {"b": "moo" * 100}, {"c": None}]
+    size = bream.estimate_size(x, fmt)
+    assert bream.estimate_size(x, fmt, budget=size) == size
+
+    with pytest.raises(bream.core.SizeBudgetExceededError) as exc_info:
+        bream.estimate_size(x, fmt, budget=size - 1)
+    assert exc_info.value.size > exc_info.value.budget
+    # The list itself overflowed, when adding its closing bracket.
+    assert exc_info.value.path == ("list",)
+
+    # We abort as soon as the string exceeds the budget.
+    with pytest.raises(
+        bream.core.SizeBudgetExceededError,
+        match=re.escape('at: document[0] -> list[1] -> dict["b"] -> str'),
+    ):
+        bream.encode_to_document(x, fmt, size_account=bream.SizeAccount(budget=200))
+
+    # Children of a dict are labelled by key, or in the pair form by the index of the
+    # pair and whether this is its key or value.
+    with pytest.raises(bream.core.SizeBudgetExceededError) as exc_info:
+        bream.estimate_size({"a": 1, "b": {"c": "d" * 100}}, fmt, budget=50)
+    assert exc_info.value.path == ('dict["b"]', 'dict["c"]', "str")
+    with pytest.raises(bream.core.SizeBudgetExceededError) as exc_info:
+        bream.estimate_size({1: "a", 2: "b" * 100}, fmt, budget=50)
+    assert exc_info.value.path == ("dict[1].value", "str")
+    with pytest.raises(bream.core.SizeBudgetExceededError) as exc_info:
+        bream.estimate_size({1: "a", "b" * 100: 2}, fmt, budget=50)
+    assert exc_info.value.path == ("dict[1].key", "str")
+
+
+def test_size_account_unwinds_on_error() -> None:
+    fmt = dict_format()
+    size_account = bream.SizeAccount(budget=100)
+    with pytest.raises(ValueError, match="No encoder"):
+        bream.encode([{"a": [1, 1j]}], fmt, size_account=size_account)
+
+    # No state from the failed encode should leak into the path.
+    with pytest.raises(
+        bream.core.SizeBudgetExceededError, match=re.escape("at: list[0] -> str")
+    ):
+        bream.encode(["a" * 200], fmt, size_account=size_account)
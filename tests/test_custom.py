@@ -1,51 +1,15 @@
 from __future__ import annotations
 
+import enum
 import typing
 from dataclasses import dataclass
+from typing import Any
 
 import pytest
 
 import bream
 from bream.core import InvalidPayloadDataError
-
-
-@typing.final
-class ComplexCoder(bream.Coder[complex]):
-    """An demonstration coder for Python's `complex` type."""
-
-    @property
-    def version(self) -> int:
-        return 1
-
-    def encode(self, value: complex, fmt: bream.SerialisationFormat) -> bream.JsonType:
-        del fmt
-        return {"real": value.real, "imag": value.imag}
-
-    def decode(
-        self,
-        data: bream.JsonType,
-        fmt: bream.SerialisationFormat,
-        coder_version: int,
-        bream_spec: int,
-    ) -> complex:
-        del bream_spec, fmt
-        if coder_version != 1:
-            raise bream.core.UnsupportedCoderVersionError(
-                coder=self, version_provided=coder_version
-            )
-        if not isinstance(data, dict) or data.keys() != {"real", "imag"}:
-            raise bream.core.InvalidPayloadDataError(
-                coder=self, data=data, msg="Invalid keys"
-            )
-        if not isinstance(data["real"], float):
-            raise bream.core.InvalidPayloadDataError(
-                coder=self, data=data, msg="Invalid 'real'"
-            )
-        if not isinstance(data["imag"], float):
-            raise bream.core.InvalidPayloadDataError(
-                coder=self, data=data, msg="Invalid 'imag'"
-            )
-        return complex(data["real"], data["imag"])
+from tests._coders import ComplexCoder
 
 
 class Moo:
@@ -180,6 +144,11 @@ def test_serialization_format_with_nesting() -> None:
     c_deserialized = bream.decode(c_serialized, fmt, bream_spec=0)
     assert c == c_deserialized
 
+    # By default, children of a custom type are labelled by their index.
+    with pytest.raises(bream.core.SizeBudgetExceededError) as exc_info:
+        bream.estimate_size(c, fmt, budget=60)
+    assert exc_info.value.path == ("cow[1]", "moo")
+
 
 def test_serialization_format_raises_for_json_codec() -> None:
     for json_type in (bool, int, float, type(None), list):
@@ -241,3 +210,137 @@ def test_serialization_format_raises_on_clashes() -> None:
                 ),
             ]
         )
+
+
+class _Colour(enum.IntEnum):
+    red = 1
+    green = 2
+
+
+@typing.final
+class IntEnumCoder(bream.Coder[int]):
+    """A coder that (lossily) encodes an `IntEnum` member as its value."""
+
+    @property
+    def version(self) -> int:
+        return 1
+
+    def encode(self, value: int, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        del fmt
+        return int(value)
+
+    def decode(
+        self,
+        data: bream.JsonType,
+        fmt: bream.SerialisationFormat,
+        coder_version: int,
+        bream_spec: int,
+    ) -> int:
+        del fmt, bream_spec
+        if coder_version != 1:
+            raise bream.core.UnsupportedCoderVersionError(
+                coder=self, version_provided=coder_version
+            )
+        if type(data) is not int:
+            raise bream.core.InvalidPayloadDataError(
+                coder=self, data=data, msg="Invalid value"
+            )
+        return data
+
+
+class _LoudMoo(Moo):
+    pass
+
+
+class _VeryLoudMoo(_LoudMoo):
+    pass
+
+
+def test_subclass_codec_resolution(monkeypatch: pytest.MonkeyPatch) -> None:
+    fmt = bream.SerialisationFormat(
+        codecs=[
+            bream.Codec(
+                bream.TypeLabel("int_enum"),
+                bream.TypeSpec.from_type(enum.IntEnum),
+                IntEnumCoder(),
+                match_subclasses=True,
+            ),
+            bream.Codec(
+                bream.TypeLabel("moo"),
+                bream.TypeSpec.from_type(Moo),
+                MooCoder(),
+                match_subclasses=True,
+            ),
+        ]
+    )
+    colour_encoded = bream.encode(_Colour.green, fmt)
+    assert colour_encoded == {"_type": "int_enum", "_version": 1, "_payload": 2}
+    colour_decoded = bream.decode(colour_encoded, fmt, bream_spec=0)
+    assert type(colour_decoded) is int
+    assert colour_decoded == _Colour.green
+    # The label written is that of the registered codec, so decoding is unambiguous.
+    for x in (_LoudMoo(), _VeryLoudMoo()):
+        x_encoded = bream.encode(x, fmt)
+        assert x_encoded == {"_type": "moo", "_version": 1, "_payload": {}}
+        assert bream.decode(x_encoded, fmt, bream_spec=0) == Moo()
+
+    # Codecs are resolved once per type, and subsequent lookups are cached.
+    resolved: list[type] = []
+    resolve_codec = fmt._resolve_codec  # noqa: SLF001
+
+    def counting_resolve_codec(type_: type) -> bream.Codec[Any] | None:
+        resolved.append(type_)
+        return resolve_codec(type_)
+
+    monkeypatch.setattr(fmt, "_resolve_codec", counting_resolve_codec)
+    for _ in range(3):
+        assert _some(fmt.find_codec_for_value(_Colour.red)).type_label == "int_enum"
+        assert _some(fmt.find_codec_for_value(_LoudMoo())).type_label == "moo"
+    assert resolved == []
+    for _ in range(3):
+        assert fmt.find_codec_for_value(1j) is None
+    assert resolved == [complex]
+
+
+def test_subclass_codec_resolution_is_opt_in() -> None:
+    fmt = bream.SerialisationFormat(
+        codecs=[
+            bream.Codec(
+                bream.TypeLabel("moo"), bream.TypeSpec.from_type(Moo), MooCoder()
+            )
+        ]
+    )
+    assert fmt.find_codec_for_value(Moo()) is not None
+    assert fmt.find_codec_for_value(_LoudMoo()) is None
+    with pytest.raises(ValueError, match="No encoder for"):
+        bream.encode(_LoudMoo(), fmt)
+
+
+def test_subclass_codec_resolution_prefers_nearest() -> None:
+    coder_moo = MooCoder()
+    coder_loud_moo = MooCoder()
+    coder_very_loud_moo = MooCoder()
+    fmt = bream.SerialisationFormat(
+        codecs=[
+            bream.Codec(
+                bream.TypeLabel("moo"),
+                bream.TypeSpec.from_type(Moo),
+                coder_moo,
+                match_subclasses=True,
+            ),
+            bream.Codec(
+                bream.TypeLabel("loud_moo"),
+                bream.TypeSpec.from_type(_LoudMoo),
+                coder_loud_moo,
+                match_subclasses=True,
+            ),
+            bream.Codec(
+                bream.TypeLabel("very_loud_moo"),
+                bream.TypeSpec.from_type(_VeryLoudMoo),
+                coder_very_loud_moo,
+            ),
+        ]
+    )
+    assert _some(fmt.find_codec_for_value(Moo())).coder is coder_moo
+    assert _some(fmt.find_codec_for_value(_LoudMoo())).coder is coder_loud_moo
+    assert _some(fmt.find_codec_for_value(_VeryLoudMoo())).coder is coder_very_loud_moo
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import typing
+
+import pytest
+
+import bream
+from bream.delta import apply, diff
+from tests._coders import dict_format
+
+
+def _check_round_trip(old: object, new: object) -> bream.JsonType:
+    fmt = dict_format()
+    old_doc = bream.encode_to_document(old, fmt)
+    new_doc = bream.encode_to_document(new, fmt)
+    # The delta must be valid JSON, and still work after a round trip through text.
+    delta: bream.JsonType = json.loads(json.dumps(diff(old_doc, new_doc, fmt)))
+    result = apply(old_doc, delta)
+    assert result == new_doc
+    # Equality above doesn't check ordering of dictionaries, which is significant.
+    assert json.dumps(result) == json.dumps(new_doc)
+
+    decoded = bream.decode_document(result, fmt)
+    assert decoded == new
+    assert repr(decoded) == repr(new)
+
+    assert isinstance(delta, dict)
+    assert delta.keys() == {"_bream_spec", "_delta"}
+    return delta["_delta"]
+
+
+def test_unchanged() -> None:
+    x = [1, {"a": 2}, {3: 4}]
+    delta = _check_round_trip(x, x)
+    assert delta == {"same": None}
+
+
+def test_scalars() -> None:
+    for old, new in (
+        (1, 2),
+        (1, 1.0),
+        (1, True),
+        (0.0, -0.0),
+        ("a", None),
+        (None, [1, 2]),
+    ):
+        delta = _check_round_trip(old, new)
+        assert delta == {"replace": new}
+
+
+def test_list() -> None:
+    old = list(range(100))
+    _check_round_trip(old, [*old, 100, 101])
+    _check_round_trip(old, old[:50])
+    _check_round_trip(old, [-1, *old])
+    _check_round_trip(old, [*old[:50], "inserted", *old[50:]])
+    _check_round_trip(old, [*old[:50], *old[60:]])
+    _check_round_trip(old, [*old[:50], 1.5, *old[51:]])
+    _check_round_trip(old, [])
+    _check_round_trip([], old)
+    _check_round_trip([1, 1, 1], [1, 1])
+
+    delta = _check_round_trip(old, [*old[:50], 1.5, *old[51:]])
+    assert delta == {
+        "list": {"start": 50, "stop": 51, "length": 1, "items": [[0, {"replace": 1.5}]]}
+    }
+
+
+def test_str_key_dict() -> None:
+    old = {"a": 1, "b": [1, 2, 3], "c": {"d": None}}
+    _check_round_trip(old, {**old, "a": 2})
+    _check_round_trip(old, {**old, "e": 5})
+    _check_round_trip(old, {"a": 1, "b": [1, 2, 3]})
+    _check_round_trip(old, {"c": {"d": None}, "b": [1, 2, 3], "a": 1})
+    _check_round_trip(old, {**old, "c": {"d": 1}})
+
+
+def test_pairs_dict() -> None:
+    old = {1: "a", 2.0: "b", False: "c", None: {"d": [1, 2]}}
+    _check_round_trip(old, {**old, 1: "z"})
+    _check_round_trip(old, {**old, "e": "new"})
+    _check_round_trip(old, {k: v for k, v in old.items() if k is not None})
+    _check_round_trip(old, dict(reversed(old.items())))
+    _check_round_trip(old, {**old, None: {"d": [1, 2, 3]}})
+
+    # Pairs are compared by key, not by position.
+    delta = _check_round_trip(old, {**old, 2.0: "z"})
+    assert delta == {
+        "payload": {"pairs": {"set": [[2.0, {"replace": "z"}]], "remove": []}}
+    }
+
+
+@dataclasses.dataclass(frozen=True)
+class _Path:
+    points: list[tuple[int, int]]
+
+
+@typing.final
+class _PathCoder(bream.Coder[_Path]):
+    """Encodes a path as a list of `[x, y]` points, which resembles a list of pairs."""
+
+    @property
+    def version(self) -> int:
+        return 1
+
+    def encode(self, value: _Path, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        del fmt
+        return [[x, y] for x, y in value.points]
+
+    def decode(
+        self,
+        data: bream.JsonType,
+        fmt: bream.SerialisationFormat,
+        coder_version: int,
+        bream_spec: int,
+    ) -> _Path:
+        del fmt, coder_version, bream_spec
+        assert isinstance(data, list)
+        points: list[tuple[int, int]] = []
+        for point in data:
+            match point:
+                case [int(x), int(y)]:
+                    points.append((x, y))
+                case _:
+                    raise bream.core.InvalidPayloadDataError(
+                        coder=self, data=data, msg="Invalid point"
+                    )
+        return _Path(points)
+
+
+def test_only_dict_coder_payloads_are_pairs() -> None:
+    fmt = dict_format(
+        bream.Codec(
+            bream.TypeLabel("path"), bream.TypeSpec.from_type(_Path), _PathCoder()
+        )
+    )
+    old = _Path([(i, i) for i in range(100)])
+    new = _Path([*old.points[:50], (-1, 50), *old.points[51:]])
+    old_doc = bream.encode_to_document(old, fmt)
+    new_doc = bream.encode_to_document(new, fmt)
+    delta = diff(old_doc, new_doc, fmt)
+    assert apply(old_doc, delta) == new_doc
+    assert bream.decode_document(apply(old_doc, delta), fmt) == new
+
+    # The point is diffed by position; treating points as pairs would instead record
+    # the order of every point, since its first element changed.
+    assert delta == {
+        "_bream_spec": bream.core.BREAM_SPEC,
+        "_delta": {
+            "payload": {
+                "list": {
+                    "start": 50,
+                    "stop": 51,
+                    "length": 1,
+                    "items": [
+                        [
+                            0,
+                            {
+                                "list": {
+                                    "start": 0,
+                                    "stop": 1,
+                                    "length": 1,
+                                    "items": [[0, {"replace": -1}]],
+                                }
+                            },
+                        ]
+                    ],
+                }
+            }
+        },
+    }
+
+
+def test_coder_encoded_replaced_on_version_change() -> None:
+    fmt = dict_format()
+    old_doc: bream.Document = {
+        "_bream_spec": bream.core.BREAM_SPEC,
+        "_payload": {"_type": "dict", "_version": 1, "_payload": [["a", 1]]},
+    }
+    new_doc = bream.encode_to_document({"a": 1}, fmt)
+    delta = diff(old_doc, new_doc, fmt)
+    assert delta == {
+        "_bream_spec": bream.core.BREAM_SPEC,
+        "_delta": {"replace": new_doc["_payload"]},
+    }
+    assert apply(old_doc, delta) == new_doc
+
+
+def test_delta_is_small() -> None:
+    fmt = dict_format()
+    old: dict[str, dict[str | int, object]] = {
+        f"key_{i}": {"values": list(range(i, i + 20)), i: str(i)} for i in range(500)
+    }
+    new = {**old, "key_250": {"values": [None], 250: "changed"}}
+    old_doc = bream.encode_to_document(old, fmt)
+    new_doc = bream.encode_to_document(new, fmt)
+    delta = diff(old_doc, new_doc, fmt)
+    assert apply(old_doc, delta) == new_doc
+    assert len(json.dumps(delta)) * 100 < len(json.dumps(new_doc))
+
+
+def test_delta_key_is_not_reserved_in_core() -> None:
+    assert "_delta" not in {key.value for key in bream.core.Keys}
+
+
+def test_invalid_delta() -> None:
+    fmt = dict_format()
+    old_doc = bream.encode_to_document([1, 2, 3], fmt)
+    with pytest.raises(ValueError, match="Invalid delta"):
+        apply(old_doc, {"moo": 1})
+    with pytest.raises(ValueError, match="Invalid delta"):
+        apply(old_doc, {"_bream_spec": 0, "_delta": {"object": {"set": {}}}})
+    with pytest.raises(ValueError, match="Invalid delta"):
+        apply(
+            old_doc,
+            {
+                "_bream_spec": 0,
+                "_delta": {"list": {"start": 2, "stop": 10, "length": 0, "items": []}},
+            },
+        )
+    with pytest.raises(ValueError, match="Invalid delta"):
+        apply(
+            old_doc,
+            {
+                "_bream_spec": 0,
+                "_delta": {"list": {"start": 1, "stop": 2, "length": -5, "items": []}},
+            },
+        )
+    orders: list[list[bream.JsonType]] = [
+        ["a"],
+        ["a", "b", "c"],
+        ["a", "a"],
+        ["b", "c"],
+        [["a"], "b"],
+        [{"a": 1}, "b"],
+        [1, "b"],
+    ]
+    for order in orders:
+        with pytest.raises(ValueError, match="Invalid delta"):
+            apply(
+                bream.encode_to_document({"a": 1, "b": 2}, fmt),
+                {
+                    "_bream_spec": 0,
+                    "_delta": {
+                        "payload": {"object": {"set": {}, "remove": [], "order": order}}
+                    },
+                },
+            )
+        with pytest.raises(ValueError, match="Invalid delta"):
+            apply(
+                bream.encode_to_document({1: 1, 2: 2}, fmt),
+                {
+                    "_bream_spec": 0,
+                    "_delta": {
+                        "payload": {"pairs": {"set": [], "remove": [], "order": order}}
+                    },
+                },
+            )
+    with pytest.raises(ValueError, match="different bream_spec"):
+        apply(old_doc, {"_bream_spec": 1, "_delta": {"same": None}})
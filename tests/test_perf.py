@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import typing
+
+import pytest
+
+import bream
+from bream.perf import (
+    REFERENCE,
+    GeneratorConfig,
+    Implementation,
+    ImplementationMismatchError,
+    compare,
+    generate,
+)
+from tests._coders import ComplexCoder, dict_format
+
+if typing.TYPE_CHECKING:
+    import random
+    from collections.abc import Callable
+
+
+def _serialisation_format() -> bream.SerialisationFormat:
+    return dict_format(
+        bream.Codec(
+            bream.TypeLabel("complex"),
+            bream.TypeSpec.from_type(complex),
+            ComplexCoder(),
+        )
+    )
+
+
+def _complex(rng: random.Random, child: Callable[[], object]) -> object:
+    del child
+    return complex(rng.random(), rng.random())
+
+
+_FACTORIES = {bream.TypeLabel("complex"): _complex}
+
+
+def _depth(x: object) -> int:
+    if isinstance(x, list):
+        return 1 + max(map(_depth, typing.cast("list[object]", x)), default=0)
+    if isinstance(x, dict):
+        return 1 + max(
+            map(_depth, typing.cast("dict[object, object]", x).values()), default=0
+        )
+    return 0
+
+
+def _leaves(x: object) -> list[object]:
+    if isinstance(x, list):
+        return [y for child in typing.cast("list[object]", x) for y in _leaves(child)]
+    if isinstance(x, dict):
+        return [
+            y
+            for child in typing.cast("dict[object, object]", x).values()
+            for y in _leaves(child)
+        ]
+    return [x]
+
+
+def test_generate_is_reproducible() -> None:
+    fmt = _serialisation_format()
+    x = generate(fmt, seed=42, n=50, factories=_FACTORIES)
+    y = generate(fmt, seed=42, n=50, factories=_FACTORIES)
+    z = generate(fmt, seed=43, n=50, factories=_FACTORIES)
+    assert x == y
+    assert x != z
+
+    x_encoded = json.dumps([bream.encode(v, fmt) for v in x])
+    y_encoded = json.dumps([bream.encode(v, fmt) for v in y])
+    assert x_encoded == y_encoded
+
+    assert any(isinstance(v, dict) for v in x)
+    assert any(isinstance(v, list) for v in x)
+    assert any(isinstance(leaf, complex) for v in x for leaf in _leaves(v))
+
+
+def test_generate_config() -> None:
+    fmt = _serialisation_format()
+    config = GeneratorConfig(max_depth=2, max_fan_out=3, max_dict_size=3)
+    values = generate(fmt, seed=0, n=200, config=config)
+    assert max(map(_depth, values)) == 2
+    assert all(
+        len(typing.cast("typing.Sized", v)) <= 3
+        for v in values
+        if isinstance(v, list | dict)
+    )
+    # Complex has no factory, so is not generated.
+    assert not any(isinstance(leaf, complex) for v in values for leaf in _leaves(v))
+
+    config = GeneratorConfig(numeric_ratio=1.0)
+    values = generate(fmt, seed=0, n=50, config=config)
+    leaves = [leaf for v in values for leaf in _leaves(v)]
+    assert leaves
+    assert all(type(leaf) in (int, float) for leaf in leaves)
+
+    config = GeneratorConfig(str_key_ratio=1.0)
+    values = generate(fmt, seed=0, n=50, config=config)
+    for v in values:
+        encoded = bream.encode(v, fmt)
+        if isinstance(v, dict):
+            assert isinstance(encoded, dict)
+            assert isinstance(encoded["_payload"], dict)
+
+
+def test_compare() -> None:
+    fmt = _serialisation_format()
+    inputs = generate(fmt, seed=1, n=20, factories=_FACTORIES)
+
+    def encode_with_options(
+        obj: object, fmt: bream.SerialisationFormat
+    ) -> bream.JsonType:
+        return bream.encode(
+            obj,
+            fmt,
+            fingerprints=bream.Fingerprints(),
+            size_account=bream.SizeAccount(),
+        )
+
+    candidate = Implementation(
+        name="with_options", encode=encode_with_options, decode=bream.decode
+    )
+    comparison = compare(REFERENCE, candidate, inputs, fmt, repeat=1)
+    assert comparison.baseline.name == "reference"
+    assert comparison.candidate.name == "with_options"
+    for measurement in (comparison.baseline, comparison.candidate):
+        assert measurement.encode_seconds > 0
+        assert measurement.decode_seconds > 0
+        assert measurement.encode_peak_bytes > 0
+        assert measurement.decode_peak_bytes > 0
+    assert comparison.encode_speedup > 0
+    assert comparison.decode_speedup > 0
+
+
+def test_compare_detects_mismatch() -> None:
+    fmt = _serialisation_format()
+    inputs: list[object] = [[1, 2], {"a": 1}, {"b": 2.0}]
+
+    def bad_encode(obj: object, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        # Incorrectly encodes floats as ints.
+        return bream.encode(int(obj) if isinstance(obj, float) else obj, fmt)
+
+    def bad_decode(
+        obj: bream.JsonType, fmt: bream.SerialisationFormat, spec: int
+    ) -> object:
+        # Incorrectly drops the contents of dicts.
+        decoded = bream.decode(obj, fmt, spec)
+        return {} if isinstance(decoded, dict) else decoded
+
+    with pytest.raises(ImplementationMismatchError) as exc_info:
+        compare(
+            REFERENCE,
+            Implementation(name="bad", encode=bad_encode, decode=bream.decode),
+            [1.5],
+            fmt,
+        )
+    assert exc_info.value.stage == "encode"
+    assert exc_info.value.index == 0
+
+    with pytest.raises(ImplementationMismatchError) as exc_info:
+        compare(
+            REFERENCE,
+            Implementation(name="bad", encode=bream.encode, decode=bad_decode),
+            inputs,
+            fmt,
+        )
+    assert exc_info.value.stage == "decode"
+    assert exc_info.value.index == 1
+
+
+def test_compare_detects_type_changes_in_decode() -> None:
+    fmt = _serialisation_format()
+
+    def int_decode(
+        obj: bream.JsonType, fmt: bream.SerialisationFormat, spec: int
+    ) -> object:
+        # Incorrectly decodes integral floats as ints, which compare equal with `==`.
+        decoded = bream.decode(obj, fmt, spec)
+        if isinstance(decoded, list):
+            return [
+                int(x) if isinstance(x, float) and x.is_integer() else x
+                for x in typing.cast("list[object]", decoded)
+            ]
+        return decoded
+
+    def reversed_decode(
+        obj: bream.JsonType, fmt: bream.SerialisationFormat, spec: int
+    ) -> object:
+        # Incorrectly reverses the order of dicts, which compare equal with `==`.
+        decoded = bream.decode(obj, fmt, spec)
+        if isinstance(decoded, dict):
+            return dict(reversed(typing.cast("dict[object, object]", decoded).items()))
+        return decoded
+
+    inputs: list[object] = [[1, 2], [1.5, 2.0], {"a": 1, "b": 2}]
+    for bad_decode, index in ((int_decode, 1), (reversed_decode, 2)):
+        encoded = bream.encode(inputs[index], fmt)
+        assert bad_decode(encoded, fmt, bream.core.BREAM_SPEC) == inputs[index]
+        with pytest.raises(ImplementationMismatchError) as exc_info:
+            compare(
+                REFERENCE,
+                Implementation(name="bad", encode=bream.encode, decode=bad_decode),
+                inputs,
+                fmt,
+            )
+        assert exc_info.value.stage == "decode"
+        assert exc_info.value.index == index
+
+
+def test_compare_is_strict_on_floats() -> None:
+    fmt = _serialisation_format()
+    inputs: list[object] = [float("nan"), [float("nan")], 0.0, -0.0]
+    # An implementation always agrees with itself, even on NaN.
+    compare(REFERENCE, REFERENCE, inputs, fmt, repeat=1)
+
+    def unsigned_encode(obj: object, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        # Incorrectly drops the sign of zero, which compares equal with `==`.
+        return bream.encode(0.0 if obj == 0 else obj, fmt)
+
+    with pytest.raises(ImplementationMismatchError) as exc_info:
+        compare(
+            REFERENCE,
+            Implementation(name="bad", encode=unsigned_encode, decode=bream.decode),
+            inputs,
+            fmt,
+        )
+    assert exc_info.value.stage == "encode"
+    assert exc_info.value.index == 3
+
+
+def test_compare_detects_tuples_in_encode() -> None:
+    fmt = _serialisation_format()
+
+    def tuple_encode(obj: object, fmt: bream.SerialisationFormat) -> bream.JsonType:
+        # Incorrectly returns a tuple, which has the same JSON text as a list.
+        encoded = bream.encode(obj, fmt)
+        if isinstance(encoded, list):
+            return typing.cast("bream.JsonType", tuple(encoded))
+        return encoded
+
+    with pytest.raises(ImplementationMismatchError) as exc_info:
+        compare(
+            REFERENCE,
+            Implementation(name="bad", encode=tuple_encode, decode=bream.decode),
+            [1, [1, 2]],
+            fmt,
+        )
+    assert exc_info.value.stage == "encode"
+    assert exc_info.value.index == 1